@@ -1,10 +1,16 @@
 import os
-import json
 import yaml
-import requests
+import asyncio
+import aiohttp
+import ijson
+import orjson
+import numpy as np
 import subprocess
 from pathlib import Path
-from collections import defaultdict
+from functools import lru_cache
+from operator import itemgetter
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
 # ------------------------------------------------------------
 # CONFIG
@@ -23,6 +29,13 @@ MOT_FPS = CONFIG["video_processing"]["mot_fps"]
 USE_ORIGINAL_RES = CONFIG["video_processing"]["use_original_resolution"]
 DEFAULT_WIDTH = CONFIG["video_processing"]["default_width"]
 DEFAULT_HEIGHT = CONFIG["video_processing"]["default_height"]
+# Optional; config.yml is bind-mounted from the host and may predate it
+JPEG_QSCALE = CONFIG["video_processing"].get("jpeg_qscale", 2)
+
+# Power-of-two strides (8, 16, ...) map LS -> MOT frames with a bit shift
+STRIDE_SHIFT = (
+    FRAME_STRIDE.bit_length() - 1 if FRAME_STRIDE & (FRAME_STRIDE - 1) == 0 else None
+)
 
 LS_URL = os.getenv("LABEL_STUDIO_URL")
 API_KEY = os.getenv("LABEL_STUDIO_API_KEY")
@@ -31,66 +44,361 @@ if not LS_URL or not API_KEY:
     raise RuntimeError("LABEL_STUDIO_URL or LABEL_STUDIO_API_KEY not set")
 
 
+# FILESYSTEM
+
+# Directories already created by this process, so repeated calls skip the
+# stat/mkdir syscalls.
+_created: set[str] = set()
+
+
+def ensure_dir(path: Path):
+    key = str(path)
+    if key not in _created:
+        path.mkdir(parents=True, exist_ok=True)
+        _created.add(key)
+
+
 # VIDEO METADATA
 
+# Persisted ffprobe results, keyed by video path. Entries are only reused
+# while the file's mtime and size still match.
+FFPROBE_CACHE_PATH = EXPORT_DIR / ".ffprobe_cache.json"
 
-def ffprobe_info(video_path: Path):
+
+def _load_ffprobe_cache():
+    try:
+        return orjson.loads(FFPROBE_CACHE_PATH.read_bytes())
+    except (FileNotFoundError, orjson.JSONDecodeError):
+        return {}
+
+
+_FFPROBE_CACHE = _load_ffprobe_cache()
+
+
+def _save_ffprobe_cache():
+    ensure_dir(EXPORT_DIR)
+    # Write-then-rename so an interrupted run never leaves a truncated cache
+    tmp = FFPROBE_CACHE_PATH.with_suffix(".tmp")
+    tmp.write_bytes(orjson.dumps(_FFPROBE_CACHE, option=orjson.OPT_INDENT_2))
+    os.replace(tmp, FFPROBE_CACHE_PATH)
+
+
+@lru_cache(maxsize=None)
+def _ffprobe_info_uncached(path: str, mtime: int, size: int):
     """
-    Auto-detect width, height, fps, duration using ffprobe
+    Run ffprobe for one (path, mtime, size) version of a video.
+
+    Falls back to the on-disk cache first; a miss spawns ffprobe and
+    records the result so the next run can skip it.
     """
+    entry = _FFPROBE_CACHE.get(path)
+    if entry and entry["mtime"] == mtime and entry["size"] == size:
+        return (
+            entry["w"],
+            entry["h"],
+            entry["fps"],
+            entry["duration"],
+            entry["total_frames"],
+        )
+
+    # Ask only for the fields we use, one "key=value" per line, and look
+    # them up by name so extra fields (e.g. side data) can't shift anything.
     cmd = [
         "ffprobe",
         "-v",
         "error",
-        "-print_format",
-        "json",
-        "-show_streams",
-        "-show_format",
-        str(video_path),
+        "-select_streams",
+        "v:0",
+        "-show_entries",
+        "stream=width,height,r_frame_rate:format=duration",
+        "-of",
+        "default=nw=1",
+        path,
     ]
-    data = json.loads(subprocess.check_output(cmd).decode())
+    fields = {}
+    for line in subprocess.check_output(cmd).decode().splitlines():
+        key, sep, value = line.partition("=")
+        if sep:
+            fields.setdefault(key, value)
 
-    stream = next(s for s in data["streams"] if s["codec_type"] == "video")
+    width = int(fields["width"])
+    height = int(fields["height"])
 
-    width = int(stream["width"])
-    height = int(stream["height"])
-
-    r_num, r_den = stream["r_frame_rate"].split("/")
+    r_num, r_den = fields["r_frame_rate"].split("/")
     fps = float(r_num) / float(r_den)
 
-    duration = float(data["format"]["duration"])
+    duration = float(fields["duration"])
     total_frames = int(duration * fps)
 
+    _FFPROBE_CACHE[path] = {
+        "mtime": mtime,
+        "size": size,
+        "w": width,
+        "h": height,
+        "fps": fps,
+        "duration": duration,
+        "total_frames": total_frames,
+    }
+    _save_ffprobe_cache()
+
     return width, height, fps, duration, total_frames
 
 
-# LABEL STUDIO EXPORT (JSON)
+def ffprobe_info(video_path: Path):
+    """
+    Auto-detect width, height, fps, duration using ffprobe
 
+    Results are memoised per file version (mtime + size), in-process and
+    in EXPORT_DIR/.ffprobe_cache.json, so re-exports skip ffprobe entirely.
+    """
+    st = video_path.stat()
+    return _ffprobe_info_uncached(str(video_path), st.st_mtime_ns, st.st_size)
 
-def fetch_ls_json_export():
-    EXPORT_DIR.mkdir(parents=True, exist_ok=True)
 
-    url = f"{LS_URL}/api/projects/{PROJECT_ID}/export"
-    headers = {
-        "Authorization": f"Token {API_KEY}",
+# FRAME EXTRACTION
+
+JPEG_SOI = b"\xff\xd8"
+JPEG_EOI = b"\xff\xd9"
+JPEG_SOS = 0xDA
+
+
+def _jpeg_end(buf: bytearray):
+    """
+    Return the end offset of the JPEG at the start of buf, or None if it
+    is not complete yet.
+
+    Header segments are skipped by their length fields, so marker-like
+    bytes inside tables can't end the image early; inside the scan data
+    0xFF is byte-stuffed, so the first FFD9 there is the real EOI.
+    """
+    if len(buf) < 2:
+        return None
+    if buf[:2] != JPEG_SOI:
+        raise RuntimeError("Unexpected data in ffmpeg MJPEG stream")
+
+    i = 2
+    while True:
+        if i + 4 > len(buf):
+            return None
+        marker = buf[i + 1]
+        i += 2 + int.from_bytes(buf[i + 2 : i + 4], "big")
+        if marker == JPEG_SOS:
+            break
+
+    end = buf.find(JPEG_EOI, i)
+    return None if end < 0 else end + 2
+
+
+def _iter_jpegs(stream, chunk_size=1 << 20):
+    """
+    Split a concatenated MJPEG byte stream into individual JPEG images.
+    """
+    buf = bytearray()
+    for chunk in iter(lambda: stream.read(chunk_size), b""):
+        buf += chunk
+        while (end := _jpeg_end(buf)) is not None:
+            yield bytes(buf[:end])
+            del buf[:end]
+
+    if buf:
+        raise RuntimeError("Truncated JPEG at end of ffmpeg MJPEG stream")
+
+
+# Encoder half of the ffmpeg command; it only depends on config, so it is
+# built once at import instead of per video.
+FFMPEG_PIPE_ARGS = [
+    "-f",
+    "image2pipe",
+    "-vcodec",
+    "mjpeg",
+    # Full-range 4:2:0, the format the mjpeg encoder would pick anyway;
+    # spelled out so the output format doesn't depend on ffmpeg's choice
+    "-pix_fmt",
+    "yuvj420p",
+    "-qscale:v",
+    str(JPEG_QSCALE),
+    "-",
+]
+
+
+# Keep EXACTLY every FRAME_STRIDE-th decoded frame by index (0, stride, ...).
+# setpts is crucial to avoid “1-frame early” drift after the first frame:
+# timestamps are rebuilt from the output index, not the source pts.
+FFMPEG_STRIDE_FILTER = (
+    f"select=not(mod(n\\,{FRAME_STRIDE})),setpts=N/FRAME_RATE/TB"
+)
+
+
+def _extraction_stamp(video_path: Path):
+    st = video_path.stat()
+    return {
+        "video": str(video_path),
+        "mtime": st.st_mtime_ns,
+        "size": st.st_size,
+        "frame_stride": FRAME_STRIDE,
+        "jpeg_qscale": JPEG_QSCALE,
     }
+
+
+def extract_frames(video_path: Path, img_dir: Path):
+    """
+    Extract EXACTLY every FRAME_STRIDE-th decoded frame (0, stride, 2*stride, ...)
+    into img_dir/000001.jpg, 000002.jpg, ...
+
+    A sibling .extracted.json records the source video version, stride and
+    frame count; if it still matches and img_dir holds that many JPEGs,
+    ffmpeg is skipped.
+
+    Returns the number of frames in img_dir.
+    """
+    stamp_path = img_dir.parent / ".extracted.json"
+    stamp = _extraction_stamp(video_path)
+    try:
+        previous = orjson.loads(stamp_path.read_bytes())
+    except (FileNotFoundError, orjson.JSONDecodeError):
+        previous = None
+
+    if previous and {k: previous.get(k) for k in stamp} == stamp:
+        existing = sum(1 for _ in img_dir.glob("*.jpg"))
+        if existing == previous["frames"]:
+            print(f"  frames already extracted, skipping ({existing} in {img_dir})")
+            return existing
+
+    # Drop the stamp first so an interrupted run is never taken as complete,
+    # and clear old frames so leftovers (e.g. from another stride) can't keep
+    # the count from ever matching again.
+    stamp_path.unlink(missing_ok=True)
+    for stale in img_dir.glob("*.jpg"):
+        stale.unlink()
+
+    cmd = [
+        "ffmpeg",
+        # Several ffmpegs run at once from the process pool; keep them off
+        # the terminal's stdin (interactive keys) so they can't fight over it
+        "-nostdin",
+        # Automatic decoder thread count (ffmpeg's default, made explicit)
+        "-threads",
+        "0",
+        "-i",
+        str(video_path),
+        "-vf",
+        FFMPEG_STRIDE_FILTER,
+        "-fps_mode",
+        "vfr",
+        *FFMPEG_PIPE_ARGS,
+    ]
+
+    # ffmpeg only encodes and pipes; file creation and writes happen on a
+    # thread pool so they overlap with decoding. Pending writes are capped so
+    # a slow disk applies back-pressure instead of buffering the sequence.
+    max_workers = 4
+    max_pending = 4 * max_workers
+    n = 0
+    with (
+        subprocess.Popen(cmd, stdout=subprocess.PIPE) as proc,
+        ThreadPoolExecutor(max_workers=max_workers) as writers,
+    ):
+        writes = deque()
+        for n, jpeg in enumerate(_iter_jpegs(proc.stdout), start=1):
+            if len(writes) >= max_pending:
+                writes.popleft().result()
+            out = img_dir / f"{n:06d}.jpg"
+            writes.append(writers.submit(out.write_bytes, jpeg))
+        for w in writes:
+            w.result()
+
+    if proc.returncode:
+        raise subprocess.CalledProcessError(proc.returncode, cmd)
+
+    stamp_path.write_bytes(orjson.dumps({**stamp, "frames": n}))
+    return n
+
+
+# LABEL STUDIO EXPORT (JSON)
+
+
+async def _fetch_project_export(session: aiohttp.ClientSession, project_id):
+    url = f"{LS_URL}/api/projects/{project_id}/export"
     params = {
         "exportType": "JSON",  # ← THIS MUST BE exportType
     }
 
-    r = requests.get(url, headers=headers, params=params)
-    r.raise_for_status()
-
-    out = EXPORT_DIR / f"project_{PROJECT_ID}_ls.json"
-    out.write_bytes(r.content)
+    out = EXPORT_DIR / f"project_{project_id}_ls.json"
+    async with session.get(url, params=params) as r:
+        r.raise_for_status()
+        # Stream to disk instead of buffering the whole export in memory
+        with out.open("wb") as f:
+            async for chunk in r.content.iter_chunked(1 << 20):
+                f.write(chunk)
 
     print(f"Label Studio JSON export saved: {out}")
     return out
 
 
+async def fetch_ls_json_export_async(project_ids=(PROJECT_ID,)):
+    """
+    Download the JSON export of each project concurrently.
+
+    Returns the export paths in the same order as project_ids.
+    """
+    ensure_dir(EXPORT_DIR)
+
+    headers = {
+        "Authorization": f"Token {API_KEY}",
+    }
+    # Large exports can take minutes to render; don't impose a total timeout
+    timeout = aiohttp.ClientTimeout(total=None)
+    async with aiohttp.ClientSession(headers=headers, timeout=timeout) as session:
+        return await asyncio.gather(
+            *(_fetch_project_export(session, pid) for pid in project_ids)
+        )
+
+
 # LS JSON -> MOT GT
 
 
+def _collect_task_tracks(task: dict, tracks_per_video):
+    """
+    Append the enabled keyframes of one Label Studio task to tracks_per_video.
+    """
+    video_url = task.get("data", {}).get("video")
+    if not video_url:
+        return
+
+    raw_name = Path(video_url).stem
+
+    # Label Studio often prefixes uploaded files: "<uuid>-<original>"
+    video_name = raw_name.split("-", 1)[1] if "-" in raw_name else raw_name
+
+    for ann in task.get("annotations", []):
+        for result in ann.get("result", []):
+            if result.get("type") != "videorectangle":
+                continue
+
+            track_key = result.get("id")  # ✅ stable unique identifier per track
+            if not track_key:
+                # Extremely defensive fallback (shouldn't happen)
+                track_key = f"{task.get('id')}-{result.get('from_name')}-{result.get('to_name')}"
+
+            value = result.get("value", {})
+            seq = value.get("sequence", [])
+
+            for kf in seq:
+                # Skip disabled keyframes (track ended / hidden)
+                if not kf.get("enabled", True):
+                    continue
+
+                ls_frame = int(kf["frame"])  # 1-based frame index in LS export
+                x = float(kf["x"])
+                y = float(kf["y"])
+                w = float(kf["width"])
+                h = float(kf["height"])
+
+                tracks_per_video[video_name][track_key].append(
+                    (ls_frame, x, y, w, h)
+                )
+
+
 def parse_ls_tracks(ls_json_path: Path):
     """
     Parse Label Studio VIDEO JSON export into per-video tracks.
@@ -107,53 +415,45 @@ def parse_ls_tracks(ls_json_path: Path):
           - ls_frame is 1-based (as exported by Label Studio)
           - x,y,w,h are percentages (0..100)
     """
-    data = json.loads(ls_json_path.read_text())
     tracks_per_video = defaultdict(lambda: defaultdict(list))
 
-    for task in data:
-        video_url = task.get("data", {}).get("video")
-        if not video_url:
-            continue
-
-        raw_name = Path(video_url).stem
-
-        # Label Studio often prefixes uploaded files: "<uuid>-<original>"
-        video_name = raw_name.split("-", 1)[1] if "-" in raw_name else raw_name
+    # Stream tasks one at a time instead of materialising the whole export
+    with ls_json_path.open("rb") as f:
+        for task in ijson.items(f, "item", use_float=True):
+            _collect_task_tracks(task, tracks_per_video)
 
-        for ann in task.get("annotations", []):
-            for result in ann.get("result", []):
-                if result.get("type") != "videorectangle":
-                    continue
-
-                track_key = result.get("id")  # ✅ stable unique identifier per track
-                if not track_key:
-                    # Extremely defensive fallback (shouldn't happen)
-                    track_key = f"{task.get('id')}-{result.get('from_name')}-{result.get('to_name')}"
+    # Sort each track by LS frame index for consistency
+    by_frame = itemgetter(0)
+    for vname in tracks_per_video:
+        for tkey in tracks_per_video[vname]:
+            tracks_per_video[vname][tkey].sort(key=by_frame)
 
-                value = result.get("value", {})
-                seq = value.get("sequence", [])
+    return tracks_per_video
 
-                for kf in seq:
-                    # Skip disabled keyframes (track ended / hidden)
-                    if not kf.get("enabled", True):
-                        continue
 
-                    ls_frame = int(kf["frame"])  # 1-based frame index in LS export
-                    x = float(kf["x"])
-                    y = float(kf["y"])
-                    w = float(kf["width"])
-                    h = float(kf["height"])
+# MOTChallenge seqinfo.ini; keys must start in column 1 for MOT parsers
+SEQINFO_TEMPLATE = (
+    "[Sequence]\n"
+    "name={}\n"
+    "imDir=img1\n"
+    "frameRate={}\n"
+    "seqLength={}\n"
+    "imWidth={}\n"
+    "imHeight={}\n"
+    "imExt=.jpg\n"
+)
 
-                    tracks_per_video[video_name][track_key].append(
-                        (ls_frame, x, y, w, h)
-                    )
+# MOTChallenge rows: frame, id, bb_left, bb_top, bb_width, bb_height, conf, ...
+GT_ROW_FMT = "%d,%d,%.1f,%.1f,%.1f,%.1f,1,-1,-1,-1\n"
+DET_ROW_FMT = "%d,-1,%.1f,%.1f,%.1f,%.1f,1.0,-1,-1,-1\n"
 
-    # Sort each track by LS frame index for consistency
-    for vname in tracks_per_video:
-        for tkey in tracks_per_video[vname]:
-            tracks_per_video[vname][tkey].sort(key=lambda tup: tup[0])
 
-    return tracks_per_video
+def _write_rows(path: Path, fmt: str, rows):
+    """
+    Stream pre-sorted rows to path through a single 1 MiB write buffer.
+    """
+    with path.open("w", newline="", buffering=1 << 20) as f:
+        f.writelines(fmt % tuple(row) for row in rows)
 
 
 def write_mot_sequence(
@@ -190,9 +490,9 @@ def write_mot_sequence(
     gt_dir = seq_dir / "gt"
     det_dir = seq_dir / "det"
     img_dir = seq_dir / "img1"
-    gt_dir.mkdir(parents=True, exist_ok=True)
-    det_dir.mkdir(parents=True, exist_ok=True)
-    img_dir.mkdir(parents=True, exist_ok=True)
+    ensure_dir(gt_dir)
+    ensure_dir(det_dir)
+    ensure_dir(img_dir)
 
     # MOT seqinfo.ini
     # For 0-based n in [0, total_frames-1], count multiples of FRAME_STRIDE.
@@ -200,104 +500,100 @@ def write_mot_sequence(
 
     # seqinfo.ini
     (seq_dir / "seqinfo.ini").write_text(
-        f"""[Sequence]
-        name={seqname}
-        imDir=img1
-        frameRate={MOT_FPS}
-        seqLength={seq_length}
-        imWidth={width}
-        imHeight={height}
-        imExt=.jpg
-        """
+        SEQINFO_TEMPLATE.format(seqname, MOT_FPS, seq_length, width, height)
     )
 
     # Map track keys (strings) -> integer MOT IDs
     track_id_map = {k: i + 1 for i, k in enumerate(sorted(tracks.keys(), key=str))}
 
-    gt_lines = []
-    det_lines = []
-
-    for track_key, frames in tracks.items():
-        mot_id = track_id_map[track_key]
-
-        for ls_frame, x, y, w, h in frames:
-            # LS frames are 1-based; convert to 0-based before stride mapping
-            ls_zero = ls_frame - 1
-
-            # Exact stride mapping: LS frame 1->0 maps to MOT frame 1
-            mot_frame = (ls_zero // FRAME_STRIDE) + 1
-
-            # Percent -> pixels
-            px = x / 100.0 * width
-            py = y / 100.0 * height
-            pw = w / 100.0 * width
-            ph = h / 100.0 * height
-
-            gt_lines.append(
-                f"{mot_frame},{mot_id},"
-                f"{px:.1f},{py:.1f},{pw:.1f},{ph:.1f},"
-                f"1,-1,-1,-1"
-            )
-
-            det_lines.append(
-                f"{mot_frame},-1,"
-                f"{px:.1f},{py:.1f},{pw:.1f},{ph:.1f},"
-                f"1.0,-1,-1,-1"
-            )
-
-    # Sort by frame (and then by id for determinism)
-    gt_lines.sort(key=lambda line: (int(line.split(",")[0]), int(line.split(",")[1])))
-    det_lines.sort(key=lambda line: int(line.split(",")[0]))
-
-    (gt_dir / "gt.txt").write_text("\n".join(gt_lines))
-    (det_dir / "det.txt").write_text("\n".join(det_lines))
-
-    # Extract frames: EXACTLY every FRAME_STRIDE-th decoded frame (0, stride, 2*stride, ...)
-    # setpts is crucial to avoid “1-frame early” drift after the first frame.
-    subprocess.run(
-        [
-            "ffmpeg",
-            "-i",
-            str(video_path),
-            "-vf",
-            f"select=not(mod(n\\,{FRAME_STRIDE})),setpts=N/FRAME_RATE/TB",
-            "-fps_mode",
-            "vfr",
-            "-qscale:v",
-            "2",
-            "-start_number",
-            "1",
-            str(img_dir / "%06d.jpg"),
-        ],
-        check=True,
-    )
+    # Flatten all tracks into one (N, 5) array of (ls_frame, x, y, w, h)
+    # plus a parallel array of MOT IDs, keeping track/keyframe order.
+    if tracks:
+        keyframes = np.concatenate(
+            [np.asarray(frames, dtype=np.float64) for frames in tracks.values()]
+        )
+        mot_ids = np.repeat(
+            [track_id_map[k] for k in tracks],
+            [len(frames) for frames in tracks.values()],
+        )
+    else:
+        keyframes = np.empty((0, 5), dtype=np.float64)
+        mot_ids = np.empty(0, dtype=np.int64)
+
+    # LS frames are 1-based; convert to 0-based before stride mapping.
+    # Exact stride mapping: LS frame 1->0 maps to MOT frame 1
+    ls_zero = keyframes[:, 0].astype(np.int32) - 1
+    if STRIDE_SHIFT is not None:
+        mot_frames = (ls_zero >> STRIDE_SHIFT) + 1
+    else:
+        mot_frames = (ls_zero // FRAME_STRIDE) + 1
+
+    # Percent -> pixels (same operation order as the scalar formula)
+    pxywh = keyframes[:, 1:] / 100.0 * np.array([width, height, width, height])
+
+    # Sort once by frame (and then by id for determinism). det.txt reuses
+    # the same ordered rows, just without the ID column.
+    rows = np.column_stack([mot_frames, mot_ids, pxywh])
+    rows = rows[np.lexsort((mot_ids, mot_frames))]
+
+    # (frame, id, x, y, w, h) for gt.txt; det.txt drops the id column.
+    gt_rows = rows.tolist()
+    det_rows = [(f, x, y, w, h) for f, _, x, y, w, h in gt_rows]
+
+    _write_rows(gt_dir / "gt.txt", GT_ROW_FMT, gt_rows)
+    _write_rows(det_dir / "det.txt", DET_ROW_FMT, det_rows)
+
+    extract_frames(video_path, img_dir)
 
     print(f"Completed MOT sequence: {seqname}")
     print(f"  -> {seq_dir}")
 
 
+def _process_one(video: Path, tracks: dict):
+    """
+    Build the MOT sequence for a single video (runs in a worker process).
+    """
+    seqname = video.stem
+    print(f"\n=== Processing {seqname} ===")
+
+    write_mot_sequence(
+        seqname=seqname,
+        video_path=video,
+        tracks=tracks,
+    )
+
+
 # MAIN
 
 if __name__ == "__main__":
-    ls_json = fetch_ls_json_export()
+    (ls_json,) = asyncio.run(fetch_ls_json_export_async())
     tracks_by_video = parse_ls_tracks(ls_json)
 
     videos = list(Path(VIDEO_DIR).glob("*.mp4"))
     if not videos:
         raise RuntimeError("No videos found in videos/ directory.")
 
+    jobs = []
     for video in videos:
-        seqname = video.stem
-        print(f"\n=== Processing {seqname} ===")
-
-        if seqname not in tracks_by_video:
+        if video.stem not in tracks_by_video:
+            print(f"\n=== Processing {video.stem} ===")
             print("No annotations found, skipping.")
             continue
-
-        write_mot_sequence(
-            seqname=seqname,
-            video_path=video,
-            tracks=tracks_by_video[seqname],
-        )
+        jobs.append(video)
+
+    # Probe up front so workers hit the seeded ffprobe cache and never race
+    # on writing the sidecar file.
+    for video in jobs:
+        ffprobe_info(video)
+
+    # ffmpeg is itself multi-threaded, so only use half the cores for videos.
+    max_workers = max(1, min(len(jobs), (os.cpu_count() or 2) // 2))
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = [
+            pool.submit(_process_one, video, dict(tracks_by_video[video.stem]))
+            for video in jobs
+        ]
+        for future in futures:
+            future.result()
 
     print("\n🎉 All sequences processed (LS JSON -> MOTChallenge).")
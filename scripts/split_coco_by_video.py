@@ -1,4 +1,4 @@
-import json
+import orjson
 from pathlib import Path
 from collections import defaultdict
 
@@ -12,37 +12,55 @@ or a frame identifier that contains the original video filename.
 
 
 def split_coco_by_video(coco_path, outdir):
-    coco = json.load(open(coco_path))
+    coco = orjson.loads(Path(coco_path).read_bytes())
     outdir = Path(outdir)
     outdir.mkdir(parents=True, exist_ok=True)
 
-    # Map: video_name → {images:[], annotations:[], categories:...}
+    # Categories are identical for every video, so encode them only once
+    categories_blob = orjson.dumps(coco.get("categories", []))
+
+    # Map: video_name → {images:[], annotations:[]}
     buckets = defaultdict(
         lambda: {
             "images": [],
             "annotations": [],
-            "categories": coco.get("categories", []),
         }
     )
 
     # Identify video from image file_name field
-    image_map = {}
     for img in coco["images"]:
         fname = img["file_name"]  # Example: "myvideo.mp4#t=12.3"
         video_name = fname.split("#")[0]  # everything before "#"
-        image_map[img["id"]] = video_name
         buckets[video_name]["images"].append(img)
 
-    # Assign annotations to the same video bucket
+    # Group annotations by image (one hash op each), then hand every image's
+    # group to its video bucket in a single extend.
+    ann_by_image = defaultdict(list)
     for ann in coco["annotations"]:
-        vid = image_map[ann["image_id"]]
-        buckets[vid]["annotations"].append(ann)
+        ann_by_image[ann["image_id"]].append(ann)
+
+    for content in buckets.values():
+        anns = content["annotations"]
+        for img in content["images"]:
+            anns.extend(ann_by_image.pop(img["id"], ()))
+
+    if ann_by_image:
+        missing = sorted(ann_by_image)
+        raise KeyError(f"Annotations reference unknown image ids: {missing}")
 
     # Output separate COCO files
     outputs = []
     for vid, content in buckets.items():
         out = outdir / f"{Path(vid).stem}_coco.json"
-        json.dump(content, open(out, "w"), indent=2)
+        out.write_bytes(
+            b'{"images":'
+            + orjson.dumps(content["images"])
+            + b',"annotations":'
+            + orjson.dumps(content["annotations"])
+            + b',"categories":'
+            + categories_blob
+            + b"}"
+        )
         outputs.append(out)
 
     return outputs